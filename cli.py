@@ -0,0 +1,265 @@
+"""
+Единая точка входа для функций решений с вводом/выводом в JSON
+
+Примеры:
+    python cli.py list
+    python cli.py call farmer.farmer_expected_value_analytical
+    python cli.py call isomorphic.is_isomorphic '["paper", "title"]'
+    python cli.py call farmer.farmer_simulation '{"n_simulations": 1000}'
+    echo '{"call": "missing_number.missing_number", "args": [[1, 2, 4]]}' | python cli.py batch
+    python cli.py startup --target-ms 50 prime_factors.prime_factors
+
+Модули решений загружаются только при вызове их функции, а тяжёлые
+зависимости (numpy) импортируются внутри функций, которым они нужны,
+поэтому быстрые функции не платят за запуск NumPy. В режиме batch один
+процесс обрабатывает поток запросов (по одному JSON на строку stdin),
+и каждый модуль загружается один раз.
+"""
+
+import time
+
+_START = time.perf_counter()
+
+import importlib.util
+import json
+import math
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_DIRS = ('probability', 'python', 'ml', 'statistics')
+
+
+def resolve_script(name):
+    """
+    Путь к файлу решения по его имени без расширения.
+
+    Args:
+        name (str): имя скрипта, например 'farmer' или 'isomorphic'
+
+    Returns:
+        str: абсолютный путь к .py-файлу
+    """
+    for directory in SCRIPT_DIRS:
+        path = os.path.join(ROOT, directory, name + '.py')
+        if os.path.isfile(path):
+            return path
+    raise KeyError(f"Скрипт не найден: {name}")
+
+
+def load_function(target):
+    """
+    Загружает функцию по адресу 'скрипт.функция'.
+
+    Каталог скрипта добавляется в sys.path, чтобы работали импорты
+    соседних модулей, а модуль регистрируется в sys.modules под своим
+    именем и при повторных вызовах не загружается заново.
+
+    Args:
+        target (str): адрес функции, например 'farmer.farmer_simulation'
+
+    Returns:
+        callable: функция решения
+    """
+    script, _, function_name = target.partition('.')
+    if not function_name or function_name.startswith('_'):
+        raise KeyError(f"Ожидается адрес публичной функции 'скрипт.функция': {target}")
+
+    module = sys.modules.get(script)
+    if module is None or getattr(module, '__file__', None) != resolve_script(script):
+        path = resolve_script(script)
+        directory = os.path.dirname(path)
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+        spec = importlib.util.spec_from_file_location(script, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[script] = module
+        spec.loader.exec_module(module)
+
+    function = getattr(module, function_name, None)
+    if not callable(function):
+        raise KeyError(f"Функция не найдена: {target}")
+    return function
+
+
+def list_functions():
+    """
+    Список доступных функций без импорта модулей (по исходному тексту).
+
+    Returns:
+        list: адреса 'скрипт.функция'
+    """
+    functions = []
+    for directory in SCRIPT_DIRS:
+        folder = os.path.join(ROOT, directory)
+        if not os.path.isdir(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if not filename.endswith('.py'):
+                continue
+            with open(os.path.join(folder, filename), encoding='utf-8') as file:
+                for line in file:
+                    if line.startswith('def ') and not line.startswith('def _') and not line.startswith('def main('):
+                        functions.append(f"{filename[:-3]}.{line[4:line.index('(')]}")
+    return functions
+
+
+def to_json(value):
+    """
+    Приводит результат функции к JSON-совместимому виду.
+
+    Кортежи и множества становятся списками, массивы и скаляры NumPy -
+    списками и числами (через tolist, без импорта numpy), ключи словарей -
+    строками. Нечисловые значения float (nan, ±inf) становятся null:
+    Infinity и NaN не входят в стандарт JSON.
+    """
+    if isinstance(value, dict):
+        return {str(key): to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(to_json(item) for item in value)
+    if hasattr(value, 'to_dict'):
+        return to_json(value.to_dict())
+    if hasattr(value, 'tolist'):
+        return to_json(value.tolist())
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def call(target, arguments=None):
+    """
+    Вызывает функцию с аргументами из JSON.
+
+    Args:
+        target (str): адрес 'скрипт.функция'
+        arguments (list | dict | None): позиционные или именованные аргументы
+
+    Returns:
+        JSON-совместимый результат
+    """
+    function = load_function(target)
+    if arguments is None:
+        result = function()
+    elif isinstance(arguments, dict):
+        result = function(**arguments)
+    elif isinstance(arguments, list):
+        result = function(*arguments)
+    else:
+        result = function(arguments)
+    return to_json(result)
+
+
+def run_batch(stream, output):
+    """
+    Обрабатывает поток запросов: одна JSON-строка на запрос.
+
+    Формат запроса: {"id": ..., "call": "скрипт.функция", "args": [...], "kwargs": {...}}.
+    Формат ответа: {"id": ..., "result": ...} или {"id": ..., "error": "..."}.
+    Ошибка в одном запросе не прерывает обработку остальных.
+
+    Returns:
+        int: количество запросов с ошибкой
+    """
+    errors = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            function = load_function(request['call'])
+            result = function(*request.get('args', []), **request.get('kwargs', {}))
+            response = {'id': request_id, 'result': to_json(result)}
+        except Exception as error:
+            errors += 1
+            response = {'id': request_id, 'error': f"{type(error).__name__}: {error}"}
+        output.write(json.dumps(response, ensure_ascii=False) + '\n')
+        output.flush()
+    return errors
+
+
+def measure_startup(target, runs=5):
+    """
+    Время запуска интерпретатора и загрузки функции в отдельном процессе.
+
+    Args:
+        target (str): адрес 'скрипт.функция'
+        runs (int): количество запусков (берётся минимум)
+
+    Returns:
+        dict: startup_ms (полное время процесса), load_ms (загрузка модуля
+              внутри процесса) и numpy_loaded (был ли импортирован numpy)
+    """
+    import subprocess
+
+    probe = (
+        "import sys, time; sys.path.insert(0, %r); import cli; "
+        "start = time.perf_counter(); cli.load_function(%r); "
+        "print((time.perf_counter() - start) * 1000, 'numpy' in sys.modules)"
+    ) % (ROOT, target)
+
+    best_total, best_load, numpy_loaded = float('inf'), float('inf'), False
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', probe], capture_output=True,
+                                text=True, check=True).stdout.split()
+        best_total = min(best_total, (time.perf_counter() - start) * 1000)
+        best_load = min(best_load, float(output[0]))
+        numpy_loaded = output[1] == 'True'
+    return {'startup_ms': round(best_total, 1), 'load_ms': round(best_load, 1), 'numpy_loaded': numpy_loaded}
+
+
+def main(argv=None):
+    """
+    Разбор аргументов командной строки.
+
+    Returns:
+        int: код возврата
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Вызов функций решений с вводом/выводом в JSON")
+    parser.add_argument('--timing', action='store_true', help="вывести время работы в stderr")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help="список доступных функций")
+
+    call_parser = commands.add_parser('call', help="вызвать одну функцию")
+    call_parser.add_argument('target', help="адрес 'скрипт.функция'")
+    call_parser.add_argument('arguments', nargs='?', help="аргументы: JSON-список или JSON-объект")
+
+    commands.add_parser('batch', help="поток запросов из stdin, по одному JSON на строку")
+
+    startup_parser = commands.add_parser('startup', help="замер времени запуска")
+    startup_parser.add_argument('targets', nargs='+', help="адреса 'скрипт.функция'")
+    startup_parser.add_argument('--target-ms', type=float, default=100.0,
+                                help="допустимое время запуска процесса, мс")
+
+    args = parser.parse_args(argv)
+    code = 0
+
+    if args.command == 'list':
+        print('\n'.join(list_functions()))
+    elif args.command == 'call':
+        arguments = json.loads(args.arguments) if args.arguments else None
+        print(json.dumps(call(args.target, arguments), ensure_ascii=False))
+    elif args.command == 'batch':
+        code = 1 if run_batch(sys.stdin, sys.stdout) else 0
+    elif args.command == 'startup':
+        for target in args.targets:
+            result = measure_startup(target)
+            result['target'] = target
+            result['ok'] = result['startup_ms'] <= args.target_ms
+            code = code or (0 if result['ok'] else 1)
+            print(json.dumps(result, ensure_ascii=False))
+
+    if args.timing:
+        print(f"{(time.perf_counter() - _START) * 1000:.1f} ms", file=sys.stderr)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
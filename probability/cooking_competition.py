@@ -11,9 +11,7 @@
 """
 
 import random
-import numpy as np
-from collections import Counter
-from itertools import combinations
+from math import comb, factorial
 
 def cooking_competition_analytical():
     """
@@ -97,42 +95,33 @@ def cooking_competition_exact_probability():
     
     return n_chefs * prob_win_both
 
-def cooking_competition_probability_distribution():
+def cooking_competition_probability_distribution(n_simulations=5000, seed=None):
     """
     Распределение вероятностей для количества победителей.
     
+    Гистограммы с разными seed можно считать в разных процессах
+    и объединять через merge.
+    
+    Args:
+        n_simulations (int): количество симуляций
+        seed (int): зерно генератора случайных чисел
+        
     Returns:
-        dict: распределение вероятностей
+        Histogram: число симуляций для каждого количества победителей 0..40
+                   (вероятности - to_dict() или probabilities())
     """
-    n_chefs = 80
-    n_simulations = 5000
-    
-    distribution = Counter()
+    import numpy as np
+    from histogram import Histogram
     
-    for _ in range(n_simulations):
-        chefs = list(range(1, n_chefs + 1))
-        
-        # Этап 1
-        random.shuffle(chefs)
-        winners_stage1 = set()
-        for i in range(0, n_chefs, 2):
-            chef1, chef2 = chefs[i], chefs[i+1]
-            winners_stage1.add(max(chef1, chef2))
-        
-        # Этап 2
-        random.shuffle(chefs)
-        winners_stage2 = set()
-        for i in range(0, n_chefs, 2):
-            chef1, chef2 = chefs[i], chefs[i+1]
-            winners_stage2.add(max(chef1, chef2))
-        
-        final_winners = len(winners_stage1.intersection(winners_stage2))
-        distribution[final_winners] += 1
+    n_chefs = 80
+    rng = np.random.default_rng(seed)
     
-    # Преобразование в вероятности
-    probabilities = {k: v/n_simulations for k, v in distribution.items()}
+    # Оба этапа симулируются векторно, без цикла по симуляциям
+    stage1 = _cooking_stage_winners(rng, n_simulations, n_chefs)
+    stage2 = _cooking_stage_winners(rng, n_simulations, n_chefs)
+    final_winners = (stage1 & stage2).sum(axis=1)
     
-    return probabilities
+    return Histogram.integer(0, n_chefs // 2).add(final_winners)
 
 def cooking_competition_detailed_analysis():
     """
@@ -168,6 +157,132 @@ def cooking_competition_detailed_analysis():
     
     return analysis
 
+def _cooking_stage_winners(rng, n_simulations, n_chefs=80):
+    """
+    Векторная симуляция одного этапа: матрица побед (строка - симуляция).
+    
+    Returns:
+        np.ndarray: булева матрица (n_simulations, n_chefs); столбец k - шеф с уровнем k + 1
+    """
+    import numpy as np
+    
+    chefs = np.argsort(rng.random((n_simulations, n_chefs)), axis=1)
+    winners = np.maximum(chefs[:, 0::2], chefs[:, 1::2])
+    won = np.zeros((n_simulations, n_chefs), dtype=bool)
+    np.put_along_axis(won, winners, True, axis=1)
+    return won
+
+def _cooking_top_pairs_distribution(n_chefs=80):
+    """
+    Точное распределение числа пар "сильный - сильный" на одном этапе.
+    
+    Сильные - верхняя половина по мастерству. Если a пар составлены
+    из сильных, то a пар - из слабых, а остальные 40 - 2a сильных
+    встречаются со слабыми: число разбиений [C(40, 2a)(2a - 1)!!]² (40 - 2a)!
+    из (79)!! равновероятных.
+    
+    Returns:
+        list: вероятности a = 0..n_chefs // 4
+    """
+    half = n_chefs // 2
+    
+    def double_factorial(k):
+        # (2k - 1)!! = (2k)! / (2^k k!)
+        return factorial(2 * k) // (2 ** k * factorial(k))
+    
+    counts = [(comb(half, 2 * a) * double_factorial(a)) ** 2 * factorial(half - 2 * a)
+              for a in range(half // 2 + 1)]
+    total = double_factorial(half)
+    return [count / total for count in counts]
+
+def _cooking_stratum_conditional(rng, n_simulations, top_pairs, prob_win, n_chefs=80):
+    """
+    Условный Монте-Карло внутри страты: первый этап с заданным числом
+    пар "сильный - сильный", второй этап заменён на Σ_{k выиграл} p_k.
+    
+    Returns:
+        np.ndarray: условные ожидания числа победителей
+    """
+    import numpy as np
+    
+    half = n_chefs // 2
+    paired = 2 * top_pairs
+    strong = np.argsort(rng.random((n_simulations, half)), axis=1) + half
+    weak = np.argsort(rng.random((n_simulations, half)), axis=1)
+    
+    # Сильные без пары из сильных встречаются со слабыми и выигрывают
+    result = prob_win[strong[:, paired:]].sum(axis=1)
+    for group in (strong, weak):
+        winners = np.maximum(group[:, 0:paired:2], group[:, 1:paired:2])
+        result += prob_win[winners].sum(axis=1)
+    return result
+
+def cooking_competition_simulation_variance_reduced(n_simulations=10000, method='conditional', seed=None):
+    """
+    Метод Монте-Карло со снижением дисперсии.
+    
+    Используются вероятности выигрыша пары для каждого шефа p_k = (k-1)/79
+    из cooking_competition_detailed_analysis:
+    - 'control': контрольные переменные Σ p_k·[k выиграл этап 1] и
+      Σ p_k·[k выиграл этап 2], их ожидание Σ p_k²;
+    - 'conditional': условный Монте-Карло - второй этап не симулируется,
+      а заменяется условным ожиданием Σ_{k выиграл этап 1} p_k;
+    - 'stratified': условный Монте-Карло со стратификацией первого этапа
+      по числу a пар из двух шефов верхней половины (вероятности страт
+      считаются точно, размеры страт пропорциональны вероятностям).
+    
+    Квазислучайные точки Соболя здесь не применяются: разбиение на пары
+    задаётся перестановкой 80 элементов, и равномерное покрытие куба
+    малой размерности (sobol_points - до 8 измерений) ей не соответствует.
+    
+    Антитетическое отражение уровней (k -> 81 - k) здесь бесполезно:
+    число выигравших оба этапа в точности равно числу проигравших оба,
+    поэтому отражённая симуляция даёт то же значение.
+    
+    Args:
+        n_simulations (int): количество симуляций
+        method (str): 'control', 'conditional' или 'stratified'
+        seed (int): зерно генератора случайных чисел
+        
+    Returns:
+        dict: оценка, стандартная ошибка и коэффициент снижения дисперсии
+    """
+    import numpy as np
+    from variance_reduction import control_variate, summarize
+    
+    n_chefs = 80
+    rng = np.random.default_rng(seed)
+    analysis = cooking_competition_detailed_analysis()
+    prob_win = np.array([analysis[k]['prob_win_single'] for k in range(1, n_chefs + 1)])
+    
+    stage1 = _cooking_stage_winners(rng, n_simulations, n_chefs)
+    stage2 = _cooking_stage_winners(rng, n_simulations, n_chefs)
+    winners = (stage1 & stage2).sum(axis=1)
+    
+    if method == 'control':
+        controls = np.column_stack([stage1 @ prob_win, stage2 @ prob_win])
+        adjusted, _ = control_variate(winners, controls, [prob_win @ prob_win] * 2)
+        return summarize(method, adjusted.mean(), adjusted.var() / n_simulations,
+                         winners.var(), n_simulations)
+    
+    if method == 'conditional':
+        # Второй этап симулирован только для оценки дисперсии обычного метода
+        conditional = stage1 @ prob_win
+        return summarize(method, conditional.mean(), conditional.var() / n_simulations,
+                         winners.var(), n_simulations)
+    
+    if method == 'stratified':
+        estimate, variance, n_trials = 0.0, 0.0, 0
+        for top_pairs, weight in enumerate(_cooking_top_pairs_distribution(n_chefs)):
+            n_stratum = max(2, round(weight * n_simulations))
+            values = _cooking_stratum_conditional(rng, n_stratum, top_pairs, prob_win, n_chefs)
+            estimate += weight * values.mean()
+            variance += weight ** 2 * values.var(ddof=1) / n_stratum
+            n_trials += n_stratum
+        return summarize(method, estimate, variance, winners.var(), n_trials)
+    
+    raise ValueError("method должен быть 'control', 'conditional' или 'stratified'")
+
 def main():
     """
     Основная функция для демонстрации всех методов решения.
@@ -194,17 +309,25 @@ def main():
     print(f"   Погрешность: {abs(analytical_result - simulation_result):.3f}")
     print()
     
+    # Снижение дисперсии
+    print(f"Снижение дисперсии (10,000 симуляций):")
+    for method in ('control', 'conditional', 'stratified'):
+        result = cooking_competition_simulation_variance_reduced(10000, method=method, seed=0)
+        print(f"   {method}: {result['estimate']:.3f} ± {result['std_error']:.4f}, "
+              f"дисперсия меньше в {result['variance_ratio']:.1f} раз")
+    print()
+    
     # Распределение вероятностей
-    probabilities = cooking_competition_probability_distribution()
+    distribution = cooking_competition_probability_distribution()
+    probabilities = distribution.to_dict()
     print(f"Распределение вероятностей:")
-    for winners_count in sorted(probabilities.keys()):
-        prob = probabilities[winners_count]
+    for winners_count, prob in probabilities.items():
         if prob > 0.01:  # Показываем только значимые вероятности
             print(f"   {winners_count} победителей: {prob:.3f} ({prob*100:.1f}%)")
     print()
     
     # Проверка через распределение
-    expected_from_distribution = sum(k * v for k, v in probabilities.items())
+    expected_from_distribution = distribution.mean()
     print(f"Проверка через распределение:")
     print(f"   E[X] = Σ(k x P(k)) = {expected_from_distribution:.2f}")
     print()
@@ -8,20 +8,20 @@
 """
 
 import random
-import numpy as np
-from collections import Counter
+from math import comb
 from itertools import product
 
-def farmer_expected_value_analytical():
+def farmer_expected_value_analytical(n_animals=6, n_visits=6):
     """
     Аналитическое решение через линейность математического ожидания.
     
+    Args:
+        n_animals (int): количество видов животных
+        n_visits (int): количество заходов в сарай
+        
     Returns:
         float: математическое ожидание количества разных видов животных
     """
-    n_animals = 6
-    n_visits = 6
-    
     # Вероятность увидеть конкретный вид животного хотя бы раз
     prob_see_animal = 1 - (1 - 1/n_animals) ** n_visits
     
@@ -53,6 +53,83 @@ def farmer_simulation(n_simulations=100000):
     
     return total_unique_animals / n_simulations
 
+def farmer_expected_collisions(order, n_animals=6, n_visits=6):
+    """
+    Математическое ожидание числа совпадений порядка order.
+    
+    Совпадение порядка k - набор из k заходов, в которые фермер видел
+    одно и то же животное. По линейности математического ожидания:
+    E = C(n_visits, k) * P(k заходов совпали) = C(n_visits, k) / n_animals^(k-1).
+    
+    Args:
+        order (int): размер набора заходов (2 - пары, 3 - тройки)
+        n_animals (int): количество видов животных
+        n_visits (int): количество заходов в сарай
+        
+    Returns:
+        float: ожидаемое число совпадений
+    """
+    return comb(n_visits, order) / n_animals ** (order - 1)
+
+def _farmer_visit_counts(uniform, n_animals=6):
+    """
+    Сколько раз за день встречено каждое животное (строка - день).
+    """
+    import numpy as np
+    
+    visits = (uniform * n_animals).astype(np.int64)
+    offsets = np.arange(visits.shape[0])[:, None] * n_animals
+    return np.bincount((visits + offsets).ravel(), minlength=visits.shape[0] * n_animals).reshape(-1, n_animals)
+
+def farmer_simulation_variance_reduced(n_simulations=100000, method='control', seed=None):
+    """
+    Метод Монте-Карло со снижением дисперсии.
+    
+    Методы:
+    - 'control': контрольные переменные - число совпавших пар и троек
+      заходов, их ожидания известны из farmer_expected_collisions;
+    - 'sobol': квазислучайные точки Соболя в 6 измерениях (по одному на заход)
+      со случайным сдвигом, дисперсия оценивается по 16 повторениям.
+    
+    Антитетические пары здесь бесполезны: замена u на 1 - u лишь
+    переименовывает животных и не меняет число разных видов.
+    
+    Args:
+        n_simulations (int): количество симуляций
+        method (str): 'control' или 'sobol'
+        seed (int): зерно генератора случайных чисел
+        
+    Returns:
+        dict: оценка, стандартная ошибка и коэффициент снижения дисперсии
+    """
+    import numpy as np
+    from variance_reduction import control_variate, replicated, sobol_points, summarize
+    
+    n_animals = 6
+    n_visits = 6
+    rng = np.random.default_rng(seed)
+    
+    if method == 'control':
+        counts = _farmer_visit_counts(rng.random((n_simulations, n_visits)), n_animals)
+        unique = (counts > 0).sum(axis=1)
+        controls = np.column_stack([(counts * (counts - 1) // 2).sum(axis=1),
+                                    (counts * (counts - 1) * (counts - 2) // 6).sum(axis=1)])
+        control_means = [farmer_expected_collisions(2, n_animals, n_visits),
+                         farmer_expected_collisions(3, n_animals, n_visits)]
+        adjusted, _ = control_variate(unique, controls, control_means)
+        return summarize(method, adjusted.mean(), adjusted.var() / n_simulations,
+                         unique.var(), n_simulations)
+    
+    if method == 'sobol':
+        # Дисперсия одного испытания обычного Монте-Карло - из точного распределения
+        plain_variance = farmer_probability_distribution().variance()
+        estimate, variance = replicated(
+            lambda n, generator: (_farmer_visit_counts(sobol_points(n, n_visits, generator), n_animals) > 0).sum(axis=1).mean(),
+            n_simulations, 16, rng)
+        return summarize(method, estimate, variance, plain_variance, n_simulations)
+    
+    raise ValueError("method должен быть 'control' или 'sobol'")
+
 def farmer_exact_calculation():
     """
     Точный расчет через перебор всех возможных комбинаций.
@@ -80,25 +157,25 @@ def farmer_probability_distribution():
     Распределение вероятностей для количества разных видов животных.
     
     Returns:
-        dict: распределение вероятностей
+        Histogram: число комбинаций для каждого количества видов 1..6
+                   (вероятности - to_dict() или probabilities())
     """
+    from histogram import Histogram
+    
     n_animals = 6
     n_visits = 6
     
-    # Подсчет всех комбинаций
+    # Подсчет всех комбинаций: счётчик по индексу "число видов - 1"
     all_combinations = product(range(1, n_animals + 1), repeat=n_visits)
-    distribution = Counter()
+    counts = [0] * n_animals
     
     for combination in all_combinations:
-        unique_count = len(set(combination))
-        distribution[unique_count] += 1
+        counts[len(set(combination)) - 1] += 1
     
-    total_combinations = n_animals ** n_visits
-    
-    # Преобразование в вероятности
-    probabilities = {k: v/total_combinations for k, v in distribution.items()}
+    distribution = Histogram.integer(1, n_animals)
+    distribution.counts += counts
     
-    return probabilities
+    return distribution
 
 def main():
     """
@@ -125,16 +202,24 @@ def main():
     print(f"   Погрешность: {abs(analytical_result - simulation_result):.4f}")
     print()
     
+    # Снижение дисперсии
+    print(f"Снижение дисперсии (65,536 симуляций):")
+    for method in ('control', 'sobol'):
+        result = farmer_simulation_variance_reduced(65536, method=method, seed=0)
+        print(f"   {method}: {result['estimate']:.4f} ± {result['std_error']:.5f}, "
+              f"дисперсия меньше в {result['variance_ratio']:.1f} раз")
+    print()
+    
     # Распределение вероятностей
-    probabilities = farmer_probability_distribution()
+    distribution = farmer_probability_distribution()
+    probabilities = distribution.to_dict()
     print(f"Распределение вероятностей:")
-    for unique_count in sorted(probabilities.keys()):
-        prob = probabilities[unique_count]
+    for unique_count, prob in probabilities.items():
         print(f"   {unique_count} разных видов: {prob:.4f} ({prob*100:.2f}%)")
     print()
     
     # Проверка через распределение
-    expected_from_distribution = sum(k * v for k, v in probabilities.items())
+    expected_from_distribution = distribution.mean()
     print(f"Проверка через распределение:")
     print(f"   E[X] = Σ(k x P(k)) = {expected_from_distribution:.4f}")
     print()
@@ -0,0 +1,246 @@
+"""
+Компактная гистограмма для распределений, получаемых в симуляциях
+
+Заменяет Counter со значениями-ключами и словарь вероятностей:
+- счётчики хранятся в одном массиве int64, границы ячеек - в массиве
+  float64, подписи ячеек (например '0-5 мин') - в кортеже;
+- объединение гистограмм из разных процессов и частей - сложение
+  массивов счётчиков за O(число ячеек);
+- счётчики доступны без копирования через буферный протокол
+  (memoryview(hist.counts), np.asarray(hist)) и восстанавливаются
+  из буфера через from_buffer; save/load пишут и читают .npz;
+- среднее, дисперсия и квантили считаются прямо по счётчикам.
+"""
+
+import os
+
+import numpy as np
+
+
+def _npz_path(path):
+    """Путь с расширением .npz, как его дописывает np.savez."""
+    path = os.fspath(path)
+    return path if path.endswith('.npz') else path + '.npz'
+
+
+class Histogram:
+    """
+    Гистограмма с ячейками [edges[i], edges[i + 1]).
+
+    Для дискретных величин (discrete=True) ячейка i соответствует
+    значению edges[i], для непрерывных представитель ячейки - её середина
+    (для открытой ячейки с бесконечной границей - конечная граница).
+
+    Args:
+        edges (array-like): возрастающие границы ячеек, len(edges) = bins + 1
+        labels (sequence): подписи ячеек (None - значения/границы)
+        discrete (bool): дискретная величина
+        counts (array-like): начальные счётчики (None - нули)
+    """
+
+    __slots__ = ("counts", "edges", "labels", "discrete")
+
+    def __init__(self, edges, labels=None, discrete=False, counts=None):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        if self.edges.ndim != 1 or self.edges.size < 2 or (np.diff(self.edges) <= 0).any():
+            raise ValueError("Границы ячеек должны строго возрастать")
+        n_bins = self.edges.size - 1
+        if labels is not None and len(labels) != n_bins:
+            raise ValueError("Количество подписей должно совпадать с количеством ячеек")
+        self.labels = None if labels is None else tuple(labels)
+        self.discrete = discrete
+        if counts is None:
+            self.counts = np.zeros(n_bins, dtype=np.int64)
+        else:
+            self.counts = np.asarray(counts, dtype=np.int64)
+            if self.counts.shape != (n_bins,):
+                raise ValueError("Размер счётчиков не совпадает с количеством ячеек")
+
+    @classmethod
+    def integer(cls, low, high):
+        """
+        Гистограмма целых значений от low до high включительно.
+
+        Args:
+            low (int): наименьшее значение
+            high (int): наибольшее значение
+
+        Returns:
+            Histogram: пустая дискретная гистограмма
+        """
+        return cls(np.arange(low, high + 2), discrete=True)
+
+    @classmethod
+    def from_buffer(cls, buffer, edges, labels=None, discrete=False):
+        """
+        Гистограмма поверх чужого буфера счётчиков без копирования.
+
+        Подходит для разделяемой памяти между процессами: изменения
+        счётчиков видны всем владельцам буфера.
+
+        Args:
+            buffer: записываемый буфер (bytearray, mmap, shared_memory.buf)
+            edges (array-like): границы ячеек
+
+        Returns:
+            Histogram: гистограмма, счётчики которой - представление buffer
+        """
+        histogram = cls(edges, labels, discrete)
+        counts = np.frombuffer(buffer, dtype=np.int64)
+        if counts.shape != histogram.counts.shape:
+            raise ValueError("Размер буфера не совпадает с количеством ячеек")
+        if not counts.flags.writeable:
+            raise ValueError("Буфер только для чтения: add и merge не смогут обновить счётчики")
+        histogram.counts = counts
+        return histogram
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is not None and np.dtype(dtype) != self.counts.dtype:
+            return self.counts.astype(dtype)
+        return self.counts.copy() if copy else self.counts
+
+    def __len__(self):
+        return self.counts.size
+
+    def __repr__(self):
+        return f"Histogram(bins={self.counts.size}, total={self.total})"
+
+    @property
+    def total(self):
+        """Общее количество наблюдений."""
+        return int(self.counts.sum())
+
+    def add(self, values):
+        """
+        Добавляет наблюдения.
+
+        Args:
+            values (array-like): значения в пределах [edges[0], edges[-1])
+
+        Returns:
+            Histogram: self
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        bins = np.searchsorted(self.edges, values, side='right') - 1
+        if ((bins < 0) | (bins >= self.counts.size)).any():
+            raise ValueError("Значения выходят за границы гистограммы")
+        self.counts += np.bincount(bins, minlength=self.counts.size)
+        return self
+
+    def merge(self, other):
+        """
+        Добавляет счётчики другой гистограммы с теми же ячейками.
+
+        Args:
+            other (Histogram): гистограмма из другого процесса или части
+
+        Returns:
+            Histogram: self
+        """
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Нельзя объединить гистограммы с разными ячейками")
+        self.counts += other.counts
+        return self
+
+    def values(self):
+        """
+        Представители ячеек для расчёта моментов.
+
+        Returns:
+            np.ndarray: значения (дискретный случай) или середины ячеек
+        """
+        left, right = self.edges[:-1], self.edges[1:]
+        if self.discrete:
+            return left.copy()
+        return np.where(np.isinf(right), left, np.where(np.isinf(left), right, (left + right) / 2))
+
+    def probabilities(self):
+        """Доли наблюдений по ячейкам."""
+        total = self.total
+        if total == 0:
+            raise ValueError("Гистограмма пуста")
+        return self.counts / total
+
+    def mean(self):
+        """Среднее по представителям ячеек."""
+        return float(self.probabilities() @ self.values())
+
+    def variance(self, ddof=0):
+        """
+        Дисперсия по представителям ячеек.
+
+        Args:
+            ddof (int): поправка на степени свободы
+        """
+        values = self.values()
+        mean = self.mean()
+        return float(self.counts @ (values - mean) ** 2 / (self.total - ddof))
+
+    def quantile(self, q):
+        """
+        Квантиль уровня q.
+
+        В дискретном случае - наименьшее значение с F(x) >= q, в
+        непрерывном - линейная интерполяция внутри ячейки.
+
+        Args:
+            q (float | array-like): уровень от 0 до 1
+
+        Returns:
+            float | np.ndarray: квантиль
+        """
+        q = np.asarray(q, dtype=np.float64)
+        cdf = np.cumsum(self.probabilities())
+        bins = np.minimum(np.searchsorted(cdf, q, side='left'), self.counts.size - 1)
+        if self.discrete:
+            result = self.edges[bins]
+        else:
+            below = np.where(bins > 0, cdf[bins - 1], 0.0)
+            share = self.probabilities()[bins]
+            fraction = np.where(share > 0, (q - below) / np.where(share > 0, share, 1), 0.0)
+            left, right = self.edges[bins], self.edges[bins + 1]
+            result = np.where(np.isinf(right), left, left + fraction * (right - left))
+        return float(result) if result.ndim == 0 else result
+
+    def keys(self):
+        """Подписи ячеек (или значения в дискретном случае)."""
+        if self.labels is not None:
+            return list(self.labels)
+        if self.discrete:
+            return [int(value) if value.is_integer() else float(value) for value in self.edges[:-1]]
+        return [f"{left:g}-{right:g}" for left, right in zip(self.edges[:-1], self.edges[1:])]
+
+    def to_dict(self):
+        """
+        Словарь {подпись: вероятность} для непустых ячеек в порядке ячеек.
+
+        Совместим с прежним форматом результатов *_probability_distribution.
+        """
+        probabilities = self.probabilities()
+        return {key: float(p) for key, p, count in zip(self.keys(), probabilities, self.counts) if count}
+
+    def save(self, path):
+        """
+        Сохраняет гистограмму в .npz без сжатия.
+
+        Args:
+            path (str): путь к файлу (расширение .npz добавляется, если его нет)
+        """
+        labels = np.array(self.labels if self.labels is not None else [], dtype=str)
+        np.savez(_npz_path(path), counts=self.counts, edges=self.edges, labels=labels,
+                 discrete=np.array(self.discrete))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Загружает гистограмму, сохранённую save.
+
+        Args:
+            path (str): путь, переданный в save (с .npz или без)
+
+        Returns:
+            Histogram: гистограмма
+        """
+        with np.load(_npz_path(path)) as data:
+            labels = data['labels'].tolist() or None
+            return cls(data['edges'], labels, bool(data['discrete']), data['counts'])
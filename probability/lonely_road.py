@@ -9,9 +9,7 @@
 """
 
 import random
-import numpy as np
 import math
-from collections import Counter
 
 def lonely_road_analytical():
     """
@@ -92,6 +90,74 @@ def lonely_road_simulation(n_simulations=100000):
     
     return prob_10_sim, prob_27_sim
 
+def lonely_road_simulation_variance_reduced(n_simulations=100000, method='stratified', seed=None):
+    """
+    Метод Монте-Карло со снижением дисперсии.
+    
+    Время до автомобиля генерируется обратной функцией распределения
+    T = -ln(1 - U) / λ, поэтому все методы работают с равномерной U:
+    - 'antithetic': пары U и 1 - U (индикатор монотонен по U,
+      поэтому значения в паре отрицательно коррелированы);
+    - 'control': контрольная переменная [T <= 30], её ожидание 0.95
+      задано условием (и совпадает с lonely_road_analytical при t = 30);
+    - 'stratified': по одной точке в каждом из n_simulations равных
+      интервалов U, дисперсия оценивается по 16 повторениям;
+    - 'sobol': одномерная последовательность Соболя (ван дер Корпута)
+      со случайным сдвигом, 16 повторений.
+    
+    Args:
+        n_simulations (int): количество симуляций
+        method (str): 'antithetic', 'control', 'stratified' или 'sobol'
+        seed (int): зерно генератора случайных чисел
+        
+    Returns:
+        tuple: (результат для 10 минут, результат для 27 минут) - словари
+               с оценкой, стандартной ошибкой и коэффициентом снижения дисперсии
+    """
+    import numpy as np
+    from variance_reduction import control_variate, replicated, sobol_points, summarize
+    
+    lambda_rate = -math.log(0.05) / 30
+    intervals = np.array([10, 27])
+    rng = np.random.default_rng(seed)
+    
+    def arrived(uniform):
+        time_to_car = -np.log1p(-uniform) / lambda_rate
+        return (time_to_car[:, None] <= intervals).astype(np.float64)
+    
+    # Дисперсия одного испытания обычного метода - из аналитического решения
+    exact = np.array(lonely_road_analytical())
+    plain_variance = exact * (1 - exact)
+    
+    n_trials = n_simulations
+    if method == 'antithetic':
+        if n_simulations < 4:
+            raise ValueError("Нужно хотя бы 4 испытания: по 2 антитетические пары")
+        uniform = rng.random(n_simulations // 2)
+        pairs = (arrived(uniform) + arrived(1 - uniform)) / 2
+        estimate, variance = pairs.mean(axis=0), pairs.var(axis=0) / pairs.shape[0]
+        # При нечётном n_simulations последнее испытание не выполняется
+        n_trials = 2 * pairs.shape[0]
+    elif method == 'control':
+        uniform = rng.random(n_simulations)
+        control = -np.log1p(-uniform) / lambda_rate <= 30
+        hits = arrived(uniform)
+        adjusted = np.column_stack([control_variate(hits[:, i], control, 0.95)[0] for i in range(2)])
+        estimate, variance = adjusted.mean(axis=0), adjusted.var(axis=0) / n_simulations
+    elif method == 'stratified':
+        def estimator(n, generator):
+            return arrived((np.arange(n) + generator.random(n)) / n).mean(axis=0)
+        estimate, variance = replicated(estimator, n_simulations, 16, rng)
+    elif method == 'sobol':
+        def estimator(n, generator):
+            return arrived(sobol_points(n, 1, generator)[:, 0]).mean(axis=0)
+        estimate, variance = replicated(estimator, n_simulations, 16, rng)
+    else:
+        raise ValueError("method должен быть 'antithetic', 'control', 'stratified' или 'sobol'")
+    
+    return tuple(summarize(method, estimate[i], variance[i], plain_variance[i], n_trials)
+                 for i in range(2))
+
 def lonely_road_exact_calculation():
     """
     Точный расчет через численное интегрирование.
@@ -136,41 +202,33 @@ def lonely_road_detailed_analysis():
     
     return analysis
 
-def lonely_road_probability_distribution():
+def lonely_road_probability_distribution(n_simulations=50000, seed=None):
     """
     Распределение вероятностей времени до первого автомобиля.
     
+    Гистограммы с разными seed можно считать в разных процессах
+    и объединять через merge.
+    
+    Args:
+        n_simulations (int): количество симуляций
+        seed (int): зерно генератора случайных чисел
+        
     Returns:
-        dict: распределение по временным интервалам
+        Histogram: число симуляций по интервалам '0-5 мин', ..., '>30 мин'
+                   (вероятности - to_dict() или probabilities())
     """
-    lambda_rate = -math.log(0.05) / 30
-    n_simulations = 50000
-    
-    distribution = Counter()
+    import numpy as np
+    from histogram import Histogram
     
-    for _ in range(n_simulations):
-        time_to_car = random.expovariate(lambda_rate)
-        
-        # Категоризируем по интервалам
-        if time_to_car <= 5:
-            distribution['0-5 мин'] += 1
-        elif time_to_car <= 10:
-            distribution['5-10 мин'] += 1
-        elif time_to_car <= 15:
-            distribution['10-15 мин'] += 1
-        elif time_to_car <= 20:
-            distribution['15-20 мин'] += 1
-        elif time_to_car <= 25:
-            distribution['20-25 мин'] += 1
-        elif time_to_car <= 30:
-            distribution['25-30 мин'] += 1
-        else:
-            distribution['>30 мин'] += 1
-    
-    # Преобразование в вероятности
-    probabilities = {k: v/n_simulations for k, v in distribution.items()}
-    
-    return probabilities
+    lambda_rate = -math.log(0.05) / 30
+    rng = np.random.default_rng(seed)
+    
+    # Категоризируем по интервалам
+    distribution = Histogram(
+        [0, 5, 10, 15, 20, 25, 30, np.inf],
+        labels=['0-5 мин', '5-10 мин', '10-15 мин', '15-20 мин', '20-25 мин', '25-30 мин', '>30 мин'],
+    )
+    return distribution.add(rng.exponential(1 / lambda_rate, n_simulations))
 
 def format_probability(prob):
     """
@@ -219,12 +277,20 @@ def main():
     print(f"   Погрешность 27 мин: {abs(prob_27 - prob_27_sim):.4f}")
     print()
     
+    # Снижение дисперсии
+    print(f"Снижение дисперсии (65,536 симуляций), во сколько раз меньше дисперсия:")
+    for method in ('antithetic', 'control', 'stratified', 'sobol'):
+        result_10, result_27 = lonely_road_simulation_variance_reduced(65536, method=method, seed=0)
+        print(f"   {method}: P(10) = {result_10['estimate']:.4f} (x{result_10['variance_ratio']:.1f}), "
+              f"P(27) = {result_27['estimate']:.4f} (x{result_27['variance_ratio']:.1f})")
+    print()
+    
     # Распределение времени до первого автомобиля
     time_distribution = lonely_road_probability_distribution()
     print(f"Распределение времени до первого автомобиля:")
-    for interval in sorted(time_distribution.keys()):
-        prob = time_distribution[interval]
+    for interval, prob in time_distribution.to_dict().items():
         print(f"   {interval}: {prob:.3f} ({prob*100:.1f}%)")
+    print(f"   Медиана: {time_distribution.quantile(0.5):.1f} мин")
     print()
     
     # Детальный анализ
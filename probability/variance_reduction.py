@@ -0,0 +1,161 @@
+"""
+Снижение дисперсии для симуляций Монте-Карло
+
+Общие инструменты для режимов снижения дисперсии в farmer.py,
+cooking_competition.py и lonely_road.py:
+- квазислучайные точки Соболя (до 8 измерений) со случайным цифровым
+  сдвигом, чтобы оценка оставалась несмещённой и имела измеримую дисперсию;
+- оценка с контрольными переменными, математические ожидания которых
+  известно из аналитического решения;
+- сводка результата: оценка, стандартная ошибка и коэффициент снижения
+  дисперсии относительно обычного Монте-Карло с тем же числом испытаний.
+"""
+
+import numpy as np
+
+
+# Направляющие числа Джо-Куо (new-joe-kuo-6.21201) для измерений 2..8:
+# (степень полинома s, коэффициенты a, начальные m_1..m_s)
+_SOBOL_DIRECTIONS = [
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+]
+_SOBOL_BITS = 32
+
+
+def _sobol_direction_vectors(dims):
+    """
+    Направляющие векторы V[d][b] (целые, 32 бита) для первых dims измерений.
+    """
+    if dims > len(_SOBOL_DIRECTIONS) + 1:
+        raise ValueError(f"Поддерживается не более {len(_SOBOL_DIRECTIONS) + 1} измерений")
+
+    vectors = np.zeros((dims, _SOBOL_BITS), dtype=np.uint64)
+    # Первое измерение - последовательность ван дер Корпута
+    vectors[0] = [1 << (_SOBOL_BITS - 1 - b) for b in range(_SOBOL_BITS)]
+
+    for d in range(1, dims):
+        s, a, m = _SOBOL_DIRECTIONS[d - 1]
+        v = [m[b] << (_SOBOL_BITS - 1 - b) for b in range(s)]
+        for b in range(s, _SOBOL_BITS):
+            value = v[b - s] ^ (v[b - s] >> s)
+            for k in range(1, s):
+                if (a >> (s - 1 - k)) & 1:
+                    value ^= v[b - k]
+            v.append(value)
+        vectors[d] = v
+    return vectors
+
+
+def sobol_points(n_points, dims, rng):
+    """
+    Точки Соболя со случайным цифровым сдвигом (XOR) на [0, 1)^dims.
+
+    Цифровой сдвиг сохраняет равномерность сетки, а каждая точка
+    отдельно распределена равномерно, поэтому среднее по точкам -
+    несмещённая оценка. Лучше всего использовать n_points = 2^k.
+
+    Args:
+        n_points (int): количество точек
+        dims (int): размерность (не более 8)
+        rng (np.random.Generator): генератор для случайного сдвига
+
+    Returns:
+        np.ndarray: точки формы (n_points, dims)
+    """
+    vectors = _sobol_direction_vectors(dims)
+    index = np.arange(n_points, dtype=np.uint64)
+    gray = index ^ (index >> np.uint64(1))
+
+    points = np.zeros((n_points, dims), dtype=np.uint64)
+    for b in range(_SOBOL_BITS):
+        has_bit = ((gray >> np.uint64(b)) & np.uint64(1)).astype(bool)
+        if not has_bit.any():
+            break
+        points[has_bit] ^= vectors[:, b]
+
+    shift = rng.integers(0, 2 ** _SOBOL_BITS, size=dims, dtype=np.uint64)
+    return (points ^ shift).astype(np.float64) / 2.0 ** _SOBOL_BITS
+
+
+def control_variate(y, controls, control_means):
+    """
+    Оценка с контрольными переменными: Y - β^T (C - E[C]).
+
+    Коэффициенты β - регрессия Y на C по тем же испытаниям
+    (при одной переменной β = cov(Y, C) / var(C)).
+
+    Args:
+        y (np.ndarray): значения оцениваемой величины по испытаниям
+        controls (np.ndarray): контрольные переменные формы (n,) или (n, m)
+        control_means (float | array-like): точные E[C] из аналитического решения
+
+    Returns:
+        tuple: (скорректированные значения, β)
+    """
+    controls = np.asarray(controls, dtype=np.float64)
+    if controls.ndim == 1:
+        controls = controls[:, None]
+    centered = controls - controls.mean(axis=0)
+    beta = np.linalg.lstsq(centered, y - y.mean(), rcond=None)[0]
+    return y - (controls - np.asarray(control_means, dtype=np.float64)) @ beta, beta
+
+
+def summarize(method, estimate, estimator_variance, plain_variance, n_trials):
+    """
+    Сводка результата режима снижения дисперсии.
+
+    Args:
+        method (str): название метода
+        estimate (float): оценка
+        estimator_variance (float): дисперсия оценки
+        plain_variance (float): дисперсия одного испытания обычного Монте-Карло
+        n_trials (int): количество испытаний
+
+    Returns:
+        dict: estimate, std_error, variance_ratio (во сколько раз меньше
+              испытаний нужно для той же ширины интервала), n_trials
+    """
+    plain_estimator_variance = plain_variance / n_trials
+    if estimator_variance > 0:
+        variance_ratio = float(plain_estimator_variance / estimator_variance)
+    elif estimator_variance == 0:
+        variance_ratio = float('inf')
+    else:
+        # Дисперсия не оценена (nan) - коэффициент тоже не определён
+        variance_ratio = float('nan')
+    return {
+        'method': method,
+        'estimate': float(estimate),
+        'std_error': float(np.sqrt(estimator_variance)),
+        'variance_ratio': variance_ratio,
+        'n_trials': int(n_trials),
+    }
+
+
+def replicated(estimator, n_trials, n_replicates, rng):
+    """
+    Оценка и её дисперсия по независимым повторениям.
+
+    Нужна для стратификации и квазислучайных точек, где испытания
+    внутри одного прогона зависимы и дисперсию нельзя оценить по ним.
+
+    Args:
+        estimator (callable): estimator(n, rng) -> оценка по n испытаниям
+        n_trials (int): общее число испытаний
+        n_replicates (int): число независимых повторений
+        rng (np.random.Generator): генератор случайных чисел
+
+    Returns:
+        tuple: (средняя оценка, дисперсия средней оценки)
+    """
+    if n_trials < 2 * n_replicates:
+        raise ValueError(f"Нужно хотя бы {2 * n_replicates} испытаний: по 2 на каждое из {n_replicates} повторений")
+    per_replicate = n_trials // n_replicates
+    estimates = np.array([estimator(per_replicate, rng) for _ in range(n_replicates)])
+    return estimates.mean(axis=0), estimates.var(axis=0, ddof=1) / n_replicates
@@ -0,0 +1,414 @@
+"""
+Асинхронный сервис с микробатчингом для is_isomorphic, missing_number и prime_factors.
+
+Множество конкурентных обработчиков вызывают функции по одному элементу.
+MicroBatcher собирает такие вызовы в пачки в пределах окна задержки
+(или до максимального размера пачки) и передаёт пачку векторной
+функции - напрямую, в пуле потоков или в пуле процессов. Очередь
+ограничена, поэтому при перегрузке вызывающие ждут (backpressure),
+а не раздувают память. Для каждого запроса замеряется задержка,
+доступны p50/p99.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from isomorphic import is_isomorphic
+from prime_factors import prime_factors
+
+
+def is_isomorphic_batch(pairs):
+    """
+    Пакетная проверка изоморфизма.
+
+    Args:
+        pairs (list): список пар строк (s, t)
+
+    Returns:
+        list: результаты is_isomorphic для каждой пары
+    """
+    return [is_isomorphic(s, t) for s, t in pairs]
+
+
+def missing_number_batch(arrays):
+    """
+    Пакетный поиск отсутствующего числа по формуле суммы.
+
+    Все массивы склеиваются, и суммы считаются одним вызовом np.add.reduceat.
+
+    Args:
+        arrays (list): список массивов чисел от 1 до n с одним пропуском
+
+    Returns:
+        list: отсутствующее число для каждого массива
+    """
+    import numpy as np
+
+    lengths = np.array([len(nums) for nums in arrays], dtype=np.int64)
+    n = lengths + 1
+    expected = n * (n + 1) // 2
+    sums = np.zeros(len(arrays), dtype=np.int64)
+    non_empty = lengths > 0
+    if non_empty.any():
+        values = np.concatenate([np.asarray(nums, dtype=np.int64) for nums in arrays if len(nums)])
+        starts = np.concatenate([[0], np.cumsum(lengths[non_empty])[:-1]])
+        sums[non_empty] = np.add.reduceat(values, starts)
+    return (expected - sums).tolist()
+
+
+# Для чисел до этой границы используется решето наименьших простых делителей
+SIEVE_LIMIT = 10 ** 7
+
+# Решето переиспользуется между пачками и растёт по мере необходимости
+_sieve_cache = []
+
+
+def _smallest_prime_factors(limit):
+    """
+    Решето: наименьший простой делитель для каждого числа от 0 до limit.
+
+    Размер решета округляется вверх до степени двойки (не больше
+    SIEVE_LIMIT), чтобы при росте чисел оно перестраивалось редко.
+    """
+    import numpy as np
+
+    if _sieve_cache and _sieve_cache[0].size > limit:
+        return _sieve_cache[0]
+
+    limit = min(SIEVE_LIMIT, 1 << max(10, limit.bit_length()))
+    spf = np.arange(limit + 1, dtype=np.int64)
+    for i in range(2, int(limit ** 0.5) + 1):
+        if spf[i] == i:
+            block = spf[i * i::i]
+            np.minimum(block, i, out=block)
+    _sieve_cache[:] = [spf]
+    return spf
+
+
+def prime_factors_batch(numbers):
+    """
+    Пакетная факторизация.
+
+    Для чисел не больше SIEVE_LIMIT строится решето наименьших простых
+    делителей до максимума пачки, после чего все числа делятся
+    одновременно: за каждый шаг от каждого числа отделяется один
+    множитель, шагов не больше log2(max). Большие числа раскладываются
+    пробным делением по одному.
+
+    Args:
+        numbers (list): натуральные числа
+
+    Returns:
+        list: списки простых множителей в порядке возрастания
+    """
+    import numpy as np
+
+    result = [[] for _ in numbers]
+    small = [i for i, n in enumerate(numbers) if 1 < n <= SIEVE_LIMIT]
+    for i, n in enumerate(numbers):
+        if n > SIEVE_LIMIT:
+            result[i] = prime_factors(n)
+    if not small:
+        return result
+
+    remaining = np.array([numbers[i] for i in small], dtype=np.int64)
+    spf = _smallest_prime_factors(int(remaining.max()))
+    owners = np.array(small)
+    while remaining.size:
+        factors = spf[remaining]
+        for owner, factor in zip(owners.tolist(), factors.tolist()):
+            result[owner].append(factor)
+        remaining //= factors
+        active = remaining > 1
+        remaining, owners = remaining[active], owners[active]
+    return result
+
+
+class LatencyStats:
+    """
+    Накопитель задержек запросов с расчётом перцентилей.
+
+    Хранит последние window запросов, чтобы долгоживущий сервис
+    не накапливал память. Задержки запросов из упавших пачек тоже
+    учитываются, а число таких запросов считается в errors.
+    """
+
+    __slots__ = ("latencies", "batch_sizes", "errors")
+
+    def __init__(self, window=100000):
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.errors = 0
+
+    def percentile(self, q):
+        """
+        Перцентиль задержки в секундах (ближайший ранг).
+
+        Args:
+            q (float): уровень от 0 до 100
+        """
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+    def summary(self):
+        """
+        Сводка: число запросов, ошибок и пачек, средний размер пачки, p50 и p99 в мс.
+        """
+        return {
+            'requests': len(self.latencies),
+            'errors': self.errors,
+            'batches': len(self.batch_sizes),
+            'mean_batch_size': sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0.0,
+            'p50_ms': self.percentile(50) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+        }
+
+
+class MicroBatcher:
+    """
+    Объединяет одиночные асинхронные вызовы в пачки.
+
+    Пачка отправляется, когда набралось max_batch_size элементов или
+    прошло max_latency секунд с момента прихода её первого элемента.
+    Одновременно обрабатывается не больше max_in_flight пачек.
+
+    Args:
+        batch_function (callable): функция list -> list результатов той же длины
+        max_batch_size (int): максимальный размер пачки
+        max_latency (float): окно ожидания пачки, секунды
+        max_queue (int): размер очереди; при заполнении submit ждёт
+        executor (concurrent.futures.Executor): пул для batch_function
+            (None - вызов прямо в цикле событий)
+        max_in_flight (int): число одновременно обрабатываемых пачек
+    """
+
+    def __init__(self, batch_function, max_batch_size=1024, max_latency=0.002,
+                 max_queue=10000, executor=None, max_in_flight=4):
+        self.batch_function = batch_function
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.executor = executor
+        self.stats = LatencyStats()
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._collector = None
+        self._batches = set()
+
+    async def start(self):
+        """Запускает сборщик пачек."""
+        if self._collector is None:
+            self._collector = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        """Дожидается обработки очереди и останавливает сборщик."""
+        await self._queue.join()
+        if self._batches:
+            await asyncio.gather(*self._batches)
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+
+    async def submit(self, item):
+        """
+        Ставит элемент в очередь и ждёт результат.
+
+        Args:
+            item: аргумент для batch_function
+
+        Returns:
+            результат для этого элемента
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        """Собирает пачки из очереди и отправляет их на обработку."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_latency
+            while len(batch) < self.max_batch_size:
+                # Сначала забираем всё, что уже лежит в очереди, без ожидания
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._in_flight.acquire()
+            task = asyncio.create_task(self._process(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _process(self, batch):
+        """Вызывает batch_function и раздаёт результаты ожидающим."""
+        items = [item for item, _, _ in batch]
+        try:
+            if self.executor is None:
+                results = self.batch_function(items)
+            else:
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(self.executor, self.batch_function, items)
+            results = list(results)
+            if len(results) != len(batch):
+                raise ValueError(f"batch_function вернула {len(results)} результатов на {len(batch)} запросов")
+        except Exception as error:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            self.stats.errors += len(batch)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            finished = time.perf_counter()
+            for _, _, submitted in batch:
+                self.stats.latencies.append(finished - submitted)
+            self.stats.batch_sizes.append(len(batch))
+            for _ in batch:
+                self._queue.task_done()
+            self._in_flight.release()
+
+
+class AlgorithmService:
+    """
+    Асинхронный фронтенд для трёх алгоритмов с отдельным батчером на каждый.
+
+    Использование:
+        async with AlgorithmService() as service:
+            await service.is_isomorphic('paper', 'title')
+
+    Args:
+        executor (concurrent.futures.Executor): пул для is_isomorphic_batch
+            (чистый Python, выигрывает от ProcessPoolExecutor); векторные
+            функции выполняются в цикле событий
+        **batcher_options: параметры MicroBatcher
+    """
+
+    def __init__(self, executor=None, **batcher_options):
+        self.batchers = {
+            'is_isomorphic': MicroBatcher(is_isomorphic_batch, executor=executor, **batcher_options),
+            'missing_number': MicroBatcher(missing_number_batch, **batcher_options),
+            'prime_factors': MicroBatcher(prime_factors_batch, **batcher_options),
+        }
+
+    async def __aenter__(self):
+        for batcher in self.batchers.values():
+            await batcher.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for batcher in self.batchers.values():
+            await batcher.stop()
+
+    async def is_isomorphic(self, s, t):
+        """Асинхронный is_isomorphic(s, t)."""
+        return await self.batchers['is_isomorphic'].submit((s, t))
+
+    async def missing_number(self, nums):
+        """Асинхронный missing_number(nums)."""
+        return await self.batchers['missing_number'].submit(nums)
+
+    async def prime_factors(self, n):
+        """Асинхронный prime_factors(n)."""
+        return await self.batchers['prime_factors'].submit(n)
+
+    def metrics(self):
+        """Сводка задержек и размеров пачек по каждому алгоритму."""
+        return {name: batcher.stats.summary() for name, batcher in self.batchers.items()}
+
+
+class LocalClient:
+    """
+    Локальный клиент-заглушка: имитирует множество конкурентных вызывающих.
+
+    Args:
+        service (AlgorithmService): сервис для вызовов
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    async def run(self, requests, concurrency=10000):
+        """
+        Выполняет запросы, держа не больше concurrency одновременных вызовов.
+
+        Args:
+            requests (list): пары (имя метода, кортеж аргументов)
+            concurrency (int): число одновременных вызывающих
+
+        Returns:
+            tuple: (список результатов в порядке запросов, запросов в секунду)
+        """
+        results = [None] * len(requests)
+        next_index = iter(range(len(requests)))
+
+        async def caller():
+            for index in next_index:
+                method, args = requests[index]
+                results[index] = await getattr(self.service, method)(*args)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(caller() for _ in range(min(concurrency, len(requests)))))
+        return results, len(requests) / (time.perf_counter() - start)
+
+
+async def _demo(n_requests=30000, concurrency=10000):
+    """
+    Нагрузочная демонстрация: concurrency вызывающих, смесь трёх алгоритмов.
+    """
+    import random
+
+    from missing_number import missing_number
+
+    rng = random.Random(0)
+    requests, expected = [], []
+    for i in range(n_requests):
+        kind = i % 3
+        if kind == 0:
+            s = ''.join(rng.choice('abc') for _ in range(8))
+            t = s.translate(str.maketrans('abc', 'xyz')) if rng.random() < 0.5 else s[::-1]
+            requests.append(('is_isomorphic', (s, t)))
+            expected.append(is_isomorphic(s, t))
+        elif kind == 1:
+            n = rng.randint(1, 50)
+            nums = list(range(1, n + 1))
+            nums.remove(rng.randint(1, n))
+            requests.append(('missing_number', (nums,)))
+            expected.append(missing_number(nums))
+        else:
+            n = rng.randint(2, 10 ** 6)
+            requests.append(('prime_factors', (n,)))
+            expected.append(prime_factors(n))
+
+    async with AlgorithmService(max_batch_size=2048, max_latency=0.005) as service:
+        results, throughput = await LocalClient(service).run(requests, concurrency)
+        metrics = service.metrics()
+
+    print(f"Запросов: {n_requests}, одновременных вызывающих: {concurrency}")
+    print(f"Результаты совпадают с прямыми вызовами: {results == expected}")
+    print(f"Пропускная способность: {throughput:,.0f} запросов/с")
+    for name, summary in metrics.items():
+        print(f"{name}: пачек {summary['batches']}, средний размер {summary['mean_batch_size']:.0f}, "
+              f"p50 {summary['p50_ms']:.1f} мс, p99 {summary['p99_ms']:.1f} мс")
+
+
+# Демонстрация
+if __name__ == "__main__":
+    asyncio.run(_demo())
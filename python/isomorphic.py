@@ -1,3 +1,6 @@
+from collections import deque
+
+
 def is_isomorphic(s: str, t: str) -> bool:
     """
     Проверяет, являются ли две строки изоморфными.
@@ -42,6 +45,190 @@ def is_isomorphic(s: str, t: str) -> bool:
     return True
 
 
+def _previous_occurrence_encoding(s: str) -> list:
+    """
+    Кодирует строку расстояниями до предыдущего вхождения символа.
+    
+    Символ на позиции i заменяется на i - j, где j - предыдущая позиция
+    того же символа, или на 0, если символ встречается впервые.
+    Две строки одной длины изоморфны тогда и только тогда, когда их
+    коды совпадают: 'paper' и 'title' -> [0, 0, 2, 0, 0].
+    
+    Args:
+        s (str): Строка
+        
+    Returns:
+        list: Код строки
+    """
+    last = {}
+    code = []
+    for i, char in enumerate(s):
+        code.append(i - last[char] if char in last else 0)
+        last[char] = i
+    return code
+
+
+class IsomorphicIndex:
+    """
+    Общий индекс для поиска окон текста, изоморфных любому из шаблонов.
+    
+    Автомат Ахо-Корасик над кодами шаблонов (_previous_occurrence_encoding).
+    В состоянии глубины d очередной символ текста кодируется расстоянием
+    до его предыдущего вхождения, если оно не больше d, и нулём иначе:
+    символ, встреченный раньше начала текущего окна, для окна новый.
+    При переходе по суффиксной ссылке глубина уменьшается, и код
+    пересчитывается для новой глубины.
+    
+    Args:
+        patterns (iterable): Непустые строки-шаблоны
+        
+    Time Complexity: O(m) на построение, m - суммарная длина шаблонов
+    Space Complexity: O(m)
+    """
+    
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        if not self.patterns or not all(self.patterns):
+            raise ValueError("Нужен хотя бы один непустой шаблон")
+        
+        # Бор по кодам шаблонов: переходы, глубины, номера шаблонов в узле
+        self._goto = [{}]
+        self._depth = [0]
+        self._output = [[]]
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for symbol in _previous_occurrence_encoding(pattern):
+                child = self._goto[node].get(symbol)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][symbol] = child
+                    self._goto.append({})
+                    self._depth.append(self._depth[node] + 1)
+                    self._output.append([])
+                node = child
+            self._output[node].append(index)
+        
+        # Суффиксные ссылки обходом в ширину; _match - ближайший по
+        # суффиксным ссылкам узел, в котором заканчивается шаблон
+        self._fail = [0] * len(self._goto)
+        self._match = [-1] * len(self._goto)
+        queue = deque([0])
+        while queue:
+            node = queue.popleft()
+            for symbol, child in self._goto[node].items():
+                if node:
+                    self._fail[child] = self._step(self._fail[node], symbol)
+                fail = self._fail[child]
+                self._match[child] = fail if self._output[fail] else self._match[fail]
+                queue.append(child)
+    
+    def _step(self, node: int, distance: int) -> int:
+        """
+        Переход автомата по символу с расстоянием distance до предыдущего
+        вхождения (0 - символ ещё не встречался).
+        """
+        while True:
+            depth = self._depth[node]
+            symbol = distance if distance <= depth else 0
+            child = self._goto[node].get(symbol)
+            if child is not None:
+                return child
+            if node == 0:
+                return 0
+            node = self._fail[node]
+    
+    def search(self, text: str) -> list:
+        """
+        Все изоморфные вхождения шаблонов в текст.
+        
+        Args:
+            text (str): Текст
+            
+        Returns:
+            list: Пары (начало окна, номер шаблона) в порядке концов окон
+            
+        Time Complexity: O(n + k), n - длина текста, k - количество вхождений
+        """
+        return self.stream().feed(text)
+    
+    def stream(self) -> "IsomorphicStream":
+        """Потоковый поиск по тексту, поступающему частями."""
+        return IsomorphicStream(self)
+
+
+class IsomorphicStream:
+    """
+    Состояние потокового поиска: текст подаётся частями через feed,
+    вхождения на границах частей не теряются.
+    
+    Хранит только узел автомата, текущую позицию и последнюю позицию
+    каждого символа - O(размер алфавита) памяти независимо от длины текста.
+    
+    Args:
+        index (IsomorphicIndex): Индекс шаблонов
+    """
+    
+    def __init__(self, index: IsomorphicIndex):
+        self.index = index
+        self.position = 0
+        self._node = 0
+        self._last = {}
+    
+    def feed(self, chunk: str) -> list:
+        """
+        Обрабатывает очередную часть текста.
+        
+        Args:
+            chunk (str): Часть текста
+            
+        Returns:
+            list: Пары (начало окна в тексте, номер шаблона) для окон,
+                  заканчивающихся в этой части
+        """
+        index = self.index
+        step, depth, output, match = index._step, index._depth, index._output, index._match
+        last = self._last
+        node = self._node
+        position = self.position
+        matches = []
+        
+        for char in chunk:
+            previous = last.get(char)
+            node = step(node, 0 if previous is None else position - previous)
+            last[char] = position
+            position += 1
+            
+            found = node if output[node] else match[node]
+            while found > 0:
+                start = position - depth[found]
+                matches.extend((start, pattern) for pattern in output[found])
+                found = match[found]
+        
+        self._node = node
+        self.position = position
+        return matches
+
+
+def find_isomorphic(text: str, pattern: str) -> list:
+    """
+    Находит все окна текста, изоморфные шаблону.
+    
+    Окно text[i:i + len(pattern)] изоморфно шаблону, если
+    is_isomorphic(text[i:i + len(pattern)], pattern) - True.
+    
+    Args:
+        text (str): Текст
+        pattern (str): Непустой шаблон
+        
+    Returns:
+        list: Начальные позиции изоморфных окон по возрастанию
+        
+    Time Complexity: O(n + m), n - длина текста, m - длина шаблона
+    Space Complexity: O(m + k), k - количество уникальных символов текста
+    """
+    return [start for start, _ in IsomorphicIndex([pattern]).search(text)]
+
+
 # Тесты
 if __name__ == "__main__":
     # Пример из задания
@@ -54,3 +241,11 @@ if __name__ == "__main__":
     print(is_isomorphic('ab', 'aa'))        # False
     print(is_isomorphic('aab', 'xxy'))      # True
     print(is_isomorphic('aab', 'xyz'))      # False
+    
+    # Поиск изоморфных окон
+    print(find_isomorphic('abbaccd', 'egg'))  # [0, 3]
+    
+    # Несколько шаблонов и текст, поступающий частями
+    stream = IsomorphicIndex(['abab', 'aab']).stream()
+    print(stream.feed('xyx'))  # []
+    print(stream.feed('yzzq'))  # [(0, 0), (4, 1)]
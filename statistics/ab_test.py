@@ -0,0 +1,540 @@
+"""
+Анализ A/B-тестов по достаточным статистикам
+
+ab_test_reasoning.md и p_value_definition.md обсуждают интерпретацию
+A/B-тестов; модуль даёт исполняемый инструмент для сотен экспериментов
+и метрик одновременно. Все тесты работают не с сырыми событиями, а с
+достаточными статистиками (n, Σy, Σy²; для CUPED ещё Σx, Σx², Σxy),
+поэтому:
+- статистики накапливаются из потока событий инкрементально;
+- состояния частей объединяются сложением;
+- t-тест Уэлча, z-тест для долей и CUPED считаются векторно сразу
+  для массива метрик;
+- последовательный тест (mSPRT) даёт всегда валидные p-value, поэтому
+  дашборд можно обновлять непрерывно без пересчёта сырых данных.
+"""
+
+import math
+
+import numpy as np
+
+
+_erfc = np.vectorize(math.erfc, otypes=[float])
+_lgamma = np.vectorize(math.lgamma, otypes=[float])
+
+
+def _normal_two_sided_p(z):
+    """
+    Двусторонний p-value стандартного нормального распределения (векторно).
+    """
+    return _erfc(np.abs(z) / math.sqrt(2))
+
+
+def _betainc(a, b, x, max_iter=500, eps=1e-14):
+    """
+    Регуляризованная неполная бета-функция I_x(a, b) (векторно).
+
+    Цепная дробь в форме Лентца (Numerical Recipes, betacf); при
+    x > (a + 1) / (a + b + 2) используется симметрия I_x(a, b) = 1 - I_{1-x}(b, a).
+    """
+    a, b, x = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (a, b, x)))
+    flip = x > (a + 1) / (a + b + 2)
+    a, b, x = np.where(flip, b, a), np.where(flip, a, b), np.where(flip, 1 - x, x)
+
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1, a - 1
+    c = np.ones_like(x)
+    d = 1 - qab * x / qap
+    d = 1 / np.where(np.abs(d) < tiny, tiny, d)
+    h = d.copy()
+    for m in range(1, max_iter + 1):
+        m2 = 2 * m
+        for numerator in (m * (b - m) * x / ((qam + m2) * (a + m2)),
+                          -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))):
+            d = 1 + numerator * d
+            d = 1 / np.where(np.abs(d) < tiny, tiny, d)
+            c = 1 + numerator / c
+            c = np.where(np.abs(c) < tiny, tiny, c)
+            delta = d * c
+            h *= delta
+        if np.all(np.abs(delta - 1) < eps):
+            break
+
+    with np.errstate(divide="ignore"):
+        log_front = (_lgamma(a + b) - _lgamma(a) - _lgamma(b)
+                     + a * np.log(x) + b * np.log1p(-x))
+    result = np.where(x > 0, np.exp(log_front) * h / a, 0.0)
+    return np.where(flip, 1 - result, result)
+
+
+def _student_two_sided_p(t, df):
+    """
+    Двусторонний p-value распределения Стьюдента (векторно).
+
+    При df <= 1000 - точно через неполную бета-функцию, при больших df -
+    через нормальное приближение Уоллеса z = (8df + 1)/(8df + 3) * sqrt(df ln(1 + t²/df)).
+    """
+    t, df = np.broadcast_arrays(np.asarray(t, dtype=np.float64), np.asarray(df, dtype=np.float64))
+    small = df <= 1000
+    result = np.empty(t.shape)
+    if small.any():
+        df_small = df[small]
+        result[small] = _betainc(df_small / 2, 0.5, df_small / (df_small + t[small] ** 2))
+    if (~small).any():
+        df_large, t_large = df[~small], t[~small]
+        with np.errstate(invalid="ignore"):
+            z = (8 * df_large + 1) / (8 * df_large + 3) * np.sqrt(df_large * np.log1p(t_large ** 2 / df_large))
+        # df = inf - нормальное распределение
+        result[~small] = _normal_two_sided_p(np.where(np.isinf(df_large), t_large, z))
+    return result
+
+
+def _student_quantile(p_two_sided, df):
+    """
+    Критическое значение t: P(|T| > t) = p_two_sided (векторная бисекция).
+
+    Верхняя граница удваивается, пока не накроет ответ: при df около 1
+    и малом уровне значимости квантиль может быть сколь угодно большим.
+    """
+    df, p_two_sided = np.broadcast_arrays(np.asarray(df, dtype=np.float64),
+                                          np.asarray(p_two_sided, dtype=np.float64))
+    low, high = np.zeros(df.shape), np.ones(df.shape)
+    for _ in range(1024):
+        too_small = _student_two_sided_p(high, df) > p_two_sided
+        if not too_small.any():
+            break
+        low, high = np.where(too_small, high, low), np.where(too_small, high * 2, high)
+    for _ in range(80):
+        mid = (low + high) / 2
+        too_small = _student_two_sided_p(mid, df) > p_two_sided
+        low, high = np.where(too_small, mid, low), np.where(too_small, high, mid)
+    return (low + high) / 2
+
+
+class MetricStats:
+    """
+    Достаточные статистики одной группы эксперимента для k метрик.
+
+    Для каждой метрики хранит n, Σy, Σy² и, для CUPED, суммы по
+    ковариате x (значение метрики до эксперимента): Σx, Σx², Σxy.
+    Состояния частей объединяются простым сложением.
+    """
+
+    __slots__ = ("n", "sum", "sum_sq", "x_sum", "x_sum_sq", "xy_sum")
+
+    def __init__(self, n_metrics):
+        self.n = np.zeros(n_metrics, dtype=np.int64)
+        self.sum = np.zeros(n_metrics)
+        self.sum_sq = np.zeros(n_metrics)
+        self.x_sum = np.zeros(n_metrics)
+        self.x_sum_sq = np.zeros(n_metrics)
+        self.xy_sum = np.zeros(n_metrics)
+
+    @classmethod
+    def from_values(cls, values, covariates=None):
+        """
+        Статистики по матрице значений на уровне пользователей.
+
+        Args:
+            values (array-like): значения формы (n, k)
+            covariates (array-like): ковариаты той же формы (None - без CUPED)
+
+        Returns:
+            MetricStats: накопленные статистики
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, None]
+            covariates = None if covariates is None else np.asarray(covariates)[:, None]
+        return cls(values.shape[1]).update(values, covariates)
+
+    def update(self, values, covariates=None):
+        """
+        Добавляет блок пользователей.
+
+        Args:
+            values (array-like): значения формы (rows, k)
+            covariates (array-like): ковариаты той же формы
+
+        Returns:
+            MetricStats: self
+        """
+        values = np.asarray(values, dtype=np.float64)
+        self.n += values.shape[0]
+        self.sum += values.sum(axis=0)
+        self.sum_sq += np.einsum('ij,ij->j', values, values)
+        if covariates is not None:
+            covariates = np.asarray(covariates, dtype=np.float64)
+            self.x_sum += covariates.sum(axis=0)
+            self.x_sum_sq += np.einsum('ij,ij->j', covariates, covariates)
+            self.xy_sum += np.einsum('ij,ij->j', covariates, values)
+        return self
+
+    def merge(self, other):
+        """
+        Объединяет статистики другой части данных с текущими.
+
+        Returns:
+            MetricStats: self
+        """
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def mean(self):
+        """Выборочные средние метрик."""
+        return self.sum / self.n
+
+    def variance(self):
+        """Несмещённые выборочные дисперсии метрик."""
+        return np.maximum(self.sum_sq - self.sum ** 2 / self.n, 0.0) / (self.n - 1)
+
+
+def welch_t_test(control, treatment, alpha=0.05):
+    """
+    t-тест Уэлча для всех метрик сразу.
+
+    Args:
+        control (MetricStats): статистики контрольной группы
+        treatment (MetricStats): статистики тестовой группы
+        alpha (float): уровень значимости для доверительного интервала
+
+    Returns:
+        dict: массивы diff, relative_diff, t, df, p_value, ci_low, ci_high
+    """
+    return _welch_from_moments(control.mean(), control.variance(), control.n,
+                               treatment.mean(), treatment.variance(), treatment.n, alpha)
+
+
+def _welch_from_moments(mean_c, var_c, n_c, mean_t, var_t, n_t, alpha=None):
+    """
+    t-тест Уэлча по средним, дисперсиям и размерам групп.
+
+    Без alpha доверительный интервал не считается (поиск квантиля - самая
+    дорогая часть для больших пакетов, например в simulate_power).
+    """
+    se2_c, se2_t = var_c / n_c, var_t / n_t
+    se = np.sqrt(se2_c + se2_t)
+    diff = mean_t - mean_c
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = diff / se
+        df = (se2_c + se2_t) ** 2 / (se2_c ** 2 / (n_c - 1) + se2_t ** 2 / (n_t - 1))
+    df = np.where(np.isfinite(df), df, 1.0)
+    result = {
+        'diff': diff,
+        'relative_diff': diff / mean_c,
+        't': t,
+        'df': df,
+        'p_value': _student_two_sided_p(np.nan_to_num(t), df),
+    }
+    if alpha is not None:
+        critical = _student_quantile(alpha, df)
+        result['ci_low'] = diff - critical * se
+        result['ci_high'] = diff + critical * se
+    return result
+
+
+def proportion_z_test(control, treatment, alpha=0.05):
+    """
+    z-тест для долей (бинарные метрики: Σy - число успехов).
+
+    Статистика использует объединённую долю, доверительный интервал -
+    раздельные дисперсии групп.
+
+    Args:
+        control (MetricStats): статистики контрольной группы
+        treatment (MetricStats): статистики тестовой группы
+        alpha (float): уровень значимости
+
+    Returns:
+        dict: массивы p_control, p_treatment, diff, z, p_value, ci_low, ci_high
+    """
+    p_c, p_t = control.mean(), treatment.mean()
+    pooled = (control.sum + treatment.sum) / (control.n + treatment.n)
+    diff = p_t - p_c
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = diff / np.sqrt(pooled * (1 - pooled) * (1 / control.n + 1 / treatment.n))
+        se = np.sqrt(p_c * (1 - p_c) / control.n + p_t * (1 - p_t) / treatment.n)
+    critical = _student_quantile(alpha, np.inf)
+    return {
+        'p_control': p_c,
+        'p_treatment': p_t,
+        'diff': diff,
+        'z': z,
+        'p_value': _normal_two_sided_p(np.nan_to_num(z)),
+        'ci_low': diff - critical * se,
+        'ci_high': diff + critical * se,
+    }
+
+
+def cuped_test(control, treatment, alpha=0.05):
+    """
+    t-тест Уэлча для CUPED-скорректированных метрик.
+
+    Y_cuped = Y - θ (X - E[X]), где θ = cov(X, Y) / var(X) оценивается по
+    объединённым группам. Дисперсия скорректированной метрики
+    var(Y) - 2θ cov(X, Y) + θ² var(X) выражается через те же суммы.
+
+    Args:
+        control (MetricStats): статистики контрольной группы (с ковариатами)
+        treatment (MetricStats): статистики тестовой группы (с ковариатами)
+        alpha (float): уровень значимости
+
+    Returns:
+        dict: результат welch_t_test плюс theta и variance_reduction (1 - ρ²)
+    """
+    pooled = MetricStats(control.n.shape[0]).merge(control).merge(treatment)
+    n = pooled.n
+    cov_xy = (pooled.xy_sum - pooled.x_sum * pooled.sum / n) / (n - 1)
+    var_x = (pooled.x_sum_sq - pooled.x_sum ** 2 / n) / (n - 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        theta = np.where(var_x > 0, cov_xy / var_x, 0.0)
+    x_mean = pooled.x_sum / n
+
+    moments = []
+    for group in (control, treatment):
+        group_n = group.n
+        g_cov = (group.xy_sum - group.x_sum * group.sum / group_n) / (group_n - 1)
+        g_var_x = (group.x_sum_sq - group.x_sum ** 2 / group_n) / (group_n - 1)
+        mean = group.mean() - theta * (group.x_sum / group_n - x_mean)
+        variance = np.maximum(group.variance() - 2 * theta * g_cov + theta ** 2 * g_var_x, 0.0)
+        moments.append((mean, variance, group_n))
+
+    result = _welch_from_moments(*moments[0], *moments[1], alpha)
+    raw_variance = control.variance() / control.n + treatment.variance() / treatment.n
+    result['theta'] = theta
+    result['variance_reduction'] = (moments[0][1] / control.n + moments[1][1] / treatment.n) / raw_variance
+    return result
+
+
+class EventAggregator:
+    """
+    Инкрементальная агрегация потока событий в достаточные статистики.
+
+    Метрика пользователя - сумма значений его событий. При каждом новом
+    событии статистики обновляются по приращению:
+    Σy += d, Σy² += (v + d)² - v², Σxy += x d, поэтому сырые события
+    не хранятся и не пересматриваются. Хранится только текущее значение
+    метрик и ковариат на пользователя.
+
+    События пользователя могут прийти раньше его ковариат: когда ковариата
+    появляется, в Σx, Σx² и Σxy добавляются x, x² и x·(текущее значение).
+    """
+
+    __slots__ = ("n_metrics", "rows", "values", "covariates", "has_covariates", "stats")
+
+    def __init__(self, n_metrics, n_groups=2):
+        self.n_metrics = n_metrics
+        self.rows = [{} for _ in range(n_groups)]
+        self.values = [np.zeros((0, n_metrics)) for _ in range(n_groups)]
+        self.covariates = [np.zeros((0, n_metrics)) for _ in range(n_groups)]
+        self.has_covariates = [np.zeros(0, dtype=bool) for _ in range(n_groups)]
+        self.stats = [MetricStats(n_metrics) for _ in range(n_groups)]
+
+    def _rows_for(self, group, units):
+        """
+        Индексы строк пользователей; новых пользователей регистрирует.
+        """
+        rows = self.rows[group]
+        index = np.empty(len(units), dtype=np.int64)
+        n_new = 0
+        for position, unit in enumerate(units):
+            row = rows.get(unit)
+            if row is None:
+                row = rows[unit] = len(rows)
+                n_new += 1
+            index[position] = row
+
+        if n_new:
+            size = len(rows)
+            capacity = self.values[group].shape[0]
+            if size > capacity:
+                grown = max(size, 2 * capacity)
+                for storage in (self.values, self.covariates, self.has_covariates):
+                    extended = np.zeros((grown,) + storage[group].shape[1:], dtype=storage[group].dtype)
+                    extended[:capacity] = storage[group]
+                    storage[group] = extended
+            self.stats[group].n += n_new
+        return index
+
+    def add_units(self, group, units, covariates=None):
+        """
+        Регистрирует пользователей, попавших в группу (в т.ч. без событий).
+
+        Ковариаты можно передать и для уже известных пользователей (например,
+        если их события пришли раньше); повторная передача той же ковариаты
+        ничего не меняет, другой - ошибка.
+
+        Args:
+            group (int): номер группы (0 - контроль, 1 - тест)
+            units (sequence): идентификаторы пользователей
+            covariates (array-like): значения метрик до эксперимента, форма (len(units), k)
+        """
+        if covariates is None:
+            self._rows_for(group, units)
+            return
+
+        covariates = np.asarray(covariates, dtype=np.float64).reshape(len(units), self.n_metrics)
+        # Проверка до изменения состояния: ковариата пользователя не меняется
+        rows = self.rows[group]
+        first_seen = {}
+        for position, unit in enumerate(units):
+            row = rows.get(unit)
+            if row is not None and self.has_covariates[group][row]:
+                known = self.covariates[group][row]
+            elif unit in first_seen:
+                known = covariates[first_seen[unit]]
+            else:
+                first_seen[unit] = position
+                continue
+            if not np.array_equal(known, covariates[position]):
+                raise ValueError(f"У пользователя {unit!r} уже другая ковариата")
+
+        index = self._rows_for(group, units)
+        positions = [position for position in first_seen.values()
+                     if not self.has_covariates[group][index[position]]]
+        if not positions:
+            return
+        new_rows = index[positions]
+        new_x = covariates[positions]
+        self.covariates[group][new_rows] = new_x
+        self.has_covariates[group][new_rows] = True
+
+        stats = self.stats[group]
+        stats.x_sum += new_x.sum(axis=0)
+        stats.x_sum_sq += (new_x ** 2).sum(axis=0)
+        stats.xy_sum += (new_x * self.values[group][new_rows]).sum(axis=0)
+
+    def add_events(self, group, units, metrics, values):
+        """
+        Добавляет пачку событий.
+
+        Args:
+            group (int): номер группы
+            units (sequence): идентификатор пользователя для каждого события
+            metrics (array-like): номер метрики для каждого события
+            values (array-like): значение каждого события
+        """
+        rows = self._rows_for(group, units)
+        metrics = np.asarray(metrics, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+
+        # Суммируем приращения по парам (пользователь, метрика)
+        keys, inverse = np.unique(rows * self.n_metrics + metrics, return_inverse=True)
+        delta = np.bincount(inverse, weights=values)
+        key_rows, key_metrics = keys // self.n_metrics, keys % self.n_metrics
+
+        storage = self.values[group]
+        old = storage[key_rows, key_metrics]
+        new = old + delta
+        storage[key_rows, key_metrics] = new
+
+        stats = self.stats[group]
+        stats.sum += np.bincount(key_metrics, weights=delta, minlength=self.n_metrics)
+        stats.sum_sq += np.bincount(key_metrics, weights=new ** 2 - old ** 2, minlength=self.n_metrics)
+        x = self.covariates[group][key_rows, key_metrics]
+        stats.xy_sum += np.bincount(key_metrics, weights=x * delta, minlength=self.n_metrics)
+
+
+class SequentialTest:
+    """
+    Последовательный тест mSPRT со всегда валидными p-value.
+
+    Используется нормальная смесь с дисперсией tau² (Johari et al., 2017):
+    Λ = sqrt(V / (V + τ²)) exp(τ² Δ² / (2 V (V + τ²))), где Δ - разница средних,
+    V - её дисперсия. p-value = min(предыдущий p, 1 / Λ), поэтому его можно
+    пересчитывать при каждом обновлении дашборда без роста ошибки I рода.
+
+    Если tau не задан, τ² метрики фиксируется при первом обновлении, на
+    котором дисперсия метрики конечна и положительна; до этого p-value
+    метрики не меняется.
+    """
+
+    __slots__ = ("tau_sq", "p_value")
+
+    def __init__(self, n_metrics, tau=None):
+        self.tau_sq = np.full(n_metrics, np.nan) if tau is None else np.broadcast_to(np.asarray(tau, dtype=np.float64) ** 2, (n_metrics,)).copy()
+        self.p_value = np.ones(n_metrics)
+
+    def update(self, control, treatment):
+        """
+        Обновляет p-value по текущим накопленным статистикам.
+
+        Args:
+            control (MetricStats): статистики контрольной группы
+            treatment (MetricStats): статистики тестовой группы
+
+        Returns:
+            dict: массивы diff, variance и всегда валидный p_value
+        """
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            diff = treatment.mean() - control.mean()
+            variance = control.variance() / control.n + treatment.variance() / treatment.n
+            unset = ~(self.tau_sq > 0)
+            if unset.any():
+                # Масштаб смеси по умолчанию - дисперсия метрики на одного пользователя
+                default = (control.variance() + treatment.variance()) / 2 * 0.01
+                ready = unset & np.isfinite(default) & (default > 0)
+                self.tau_sq[ready] = default[ready]
+            log_lambda = (0.5 * np.log(variance / (variance + self.tau_sq))
+                          + self.tau_sq * diff ** 2 / (2 * variance * (variance + self.tau_sq)))
+            p_current = np.minimum(1.0, np.exp(-log_lambda))
+        p_current = np.where(np.isfinite(p_current), p_current, 1.0)
+        self.p_value = np.minimum(self.p_value, p_current)
+        return {'diff': diff, 'variance': variance, 'p_value': self.p_value.copy()}
+
+
+def main():
+    """
+    Демонстрация: поток событий по трём метрикам с непрерывным обновлением.
+    """
+    rng = np.random.default_rng(7)
+    n_metrics = 3
+    names = ['выручка', 'заказы', 'конверсия']
+    effect = np.array([0.05, 0.0, 0.02])
+
+    aggregator = EventAggregator(n_metrics)
+    sequential = SequentialTest(n_metrics)
+    users = 20_000
+
+    print("A/B-ТЕСТ ПО ДОСТАТОЧНЫМ СТАТИСТИКАМ")
+    print("=" * 35)
+    pre_period = rng.gamma(2.0, 1.0, size=(2, users, n_metrics))
+    for group in (0, 1):
+        aggregator.add_units(group, [(group, i) for i in range(users)], covariates=pre_period[group])
+    converted = np.zeros((2, users), dtype=bool)
+
+    for day in range(1, 8):
+        for group in (0, 1):
+            n_events = 30_000
+            user_ids = rng.integers(0, users, n_events)
+            units = [(group, i) for i in user_ids]
+            metrics = rng.integers(0, 2, n_events)
+            values = (0.5 * pre_period[group, user_ids, metrics]
+                      + rng.exponential(1.0, n_events) * (1 + group * effect[metrics]))
+            aggregator.add_events(group, units, metrics, values)
+
+            # Конверсия - бинарная метрика: событие не чаще одного раза на пользователя
+            new = ~converted[group] & (rng.random(users) < 0.01 * (1 + group * effect[2] * 10))
+            converted[group] |= new
+            aggregator.add_events(group, [(group, i) for i in np.flatnonzero(new)],
+                                  np.full(new.sum(), 2), np.ones(new.sum()))
+
+        control, treatment = aggregator.stats
+        result = sequential.update(control, treatment)
+        print(f"День {day}: всегда валидные p-value = {np.round(result['p_value'], 4).tolist()}")
+    print()
+
+    control, treatment = aggregator.stats
+    welch = welch_t_test(control, treatment)
+    cuped = cuped_test(control, treatment)
+    for metric, name in enumerate(names[:2]):
+        print(f"{name}: Уэлч p = {welch['p_value'][metric]:.4f}, CUPED p = {cuped['p_value'][metric]:.4f}, "
+              f"дисперсия CUPED / исходная = {cuped['variance_reduction'][metric]:.3f}")
+    proportions = proportion_z_test(control, treatment)
+    print(f"{names[2]}: z-тест долей p = {proportions['p_value'][2]:.4f}")
+    print("=" * 15)
+
+
+if __name__ == "__main__":
+    main()
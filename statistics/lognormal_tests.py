@@ -0,0 +1,325 @@
+"""
+Тесты для метрик с тяжёлым хвостом (логнормальное распределение)
+
+t_test_applicability.md рекомендует t-тест для логнормальных метрик при
+большом n. Модуль даёт инструменты, чтобы проверить эту рекомендацию
+на реальных размерах выборок:
+- t-тест Уэлча на логарифмированных данных (сравнение геометрических средних);
+- тест отношения (ratio-метрики и относительный прирост) дельта-методом;
+- пуассоновский бутстрап: веса Poisson(1) генерируются матрицей,
+  средние реплик считаются матричным умножением, блоки реплик
+  распределяются по процессам;
+- Монте-Карло симулятор мощности и ошибки I рода: 10^5 синтетических
+  экспериментов генерируются пакетами NumPy, и все тесты считаются
+  векторно сразу для пакета.
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ab_test import MetricStats, welch_t_test, _normal_two_sided_p, _student_quantile, _welch_from_moments
+
+
+def fit_lognormal(values):
+    """
+    Оценка параметров логнормального распределения по данным.
+
+    Args:
+        values (array-like): положительные значения метрики
+
+    Returns:
+        tuple: (mu, sigma) логарифма метрики
+    """
+    logs = np.log(np.asarray(values, dtype=np.float64))
+    return float(logs.mean()), float(logs.std(ddof=1))
+
+
+def log_t_test(control, treatment, alpha=0.05):
+    """
+    t-тест Уэлча на логарифмированных данных.
+
+    Проверяет равенство средних логарифмов, т.е. геометрических средних
+    (для логнормальных данных с одинаковой sigma - равенство медиан и средних).
+
+    Args:
+        control (array-like): положительные значения контрольной группы
+        treatment (array-like): положительные значения тестовой группы
+        alpha (float): уровень значимости
+
+    Returns:
+        dict: результат Уэлча для логарифмов и ratio - отношение
+              геометрических средних с доверительным интервалом
+    """
+    control = np.asarray(control, dtype=np.float64)
+    treatment = np.asarray(treatment, dtype=np.float64)
+    if (control <= 0).any() or (treatment <= 0).any():
+        raise ValueError("Логарифмирование требует положительных значений")
+
+    result = {key: value[0] for key, value in welch_t_test(
+        MetricStats.from_values(np.log(control)), MetricStats.from_values(np.log(treatment)), alpha
+    ).items()}
+    result['ratio'] = math.exp(result['diff'])
+    result['ratio_ci_low'] = math.exp(result['ci_low'])
+    result['ratio_ci_high'] = math.exp(result['ci_high'])
+    return result
+
+
+def _ratio_moments(numerator, denominator):
+    """
+    Отношение Σnum / Σden и его дисперсия по дельта-методу.
+    """
+    numerator = np.asarray(numerator, dtype=np.float64)
+    n = numerator.shape[0]
+    if denominator is None:
+        return numerator.mean(), numerator.var(ddof=1) / n
+
+    denominator = np.asarray(denominator, dtype=np.float64)
+    mean_num, mean_den = numerator.mean(), denominator.mean()
+    ratio = mean_num / mean_den
+    var_num = numerator.var(ddof=1)
+    var_den = denominator.var(ddof=1)
+    cov = np.cov(numerator, denominator)[0, 1]
+    variance = (var_num - 2 * ratio * cov + ratio ** 2 * var_den) / (n * mean_den ** 2)
+    return ratio, variance
+
+
+def _relative_lift(ratio_c, var_c, ratio_t, var_t):
+    """
+    Относительный прирост R_t / R_c - 1 и его стандартная ошибка
+    по дельта-методу (работает и с массивами).
+    """
+    relative = ratio_t / ratio_c - 1
+    relative_se = np.sqrt(var_t / ratio_c ** 2 + ratio_t ** 2 * var_c / ratio_c ** 4)
+    return relative, relative_se
+
+
+def delta_method_ratio_test(numerator_c, numerator_t, denominator_c=None, denominator_t=None, alpha=0.05):
+    """
+    Тест отношения дельта-методом.
+
+    Без знаменателей сравнивает средние, со знаменателями - ratio-метрики
+    Σnum / Σden (например, выручка на заказ), где num и den - значения на
+    уровне пользователя. Статистика, p-value и доверительный интервал
+    относятся к одной величине - относительному приросту
+    treatment / control - 1 с ошибкой по дельта-методу; ту же статистику
+    использует simulate_power.
+
+    Args:
+        numerator_c (array-like): числитель на пользователя, контроль
+        numerator_t (array-like): числитель на пользователя, тест
+        denominator_c (array-like): знаменатель на пользователя, контроль
+        denominator_t (array-like): знаменатель на пользователя, тест
+        alpha (float): уровень значимости
+
+    Returns:
+        dict: ratio_control, ratio_treatment, diff, relative_diff, z, p_value
+              и доверительный интервал относительного прироста
+    """
+    ratio_c, var_c = _ratio_moments(numerator_c, denominator_c)
+    ratio_t, var_t = _ratio_moments(numerator_t, denominator_t)
+
+    relative, relative_se = _relative_lift(ratio_c, var_c, ratio_t, var_t)
+    z = relative / relative_se
+    critical = float(_student_quantile(alpha, np.inf))
+    return {
+        'ratio_control': float(ratio_c),
+        'ratio_treatment': float(ratio_t),
+        'diff': float(ratio_t - ratio_c),
+        'relative_diff': float(relative),
+        'z': float(z),
+        'p_value': float(_normal_two_sided_p(z)),
+        'relative_ci_low': float(relative - critical * relative_se),
+        'relative_ci_high': float(relative + critical * relative_se),
+    }
+
+
+# Функция распределения Poisson(1): P(X >= 9) ~ 1e-6, хвост отбрасывается.
+# Скрипты блоков не импортируют друг друга, поэтому генератор весов
+# повторяет _poisson_weights из ml/auc_bootstrap.py
+_POISSON_CDF = np.cumsum([math.exp(-1) / math.factorial(k) for k in range(9)]).astype(np.float32)
+
+
+def _poisson_weights(rng, shape):
+    """
+    Веса Poisson(1) через сравнение равномерных величин с порогами.
+    """
+    uniform = rng.random(shape, dtype=np.float32)
+    weights = (uniform > _POISSON_CDF[0]).astype(np.float64)
+    for threshold in _POISSON_CDF[1:]:
+        weights += uniform > threshold
+    return weights
+
+
+def _bootstrap_means_worker(values, n_replicates, seed, block_elements):
+    """
+    Средние n_replicates пуассоновских реплик в одном процессе.
+
+    Returns:
+        np.ndarray: средние реплик длины n_replicates
+    """
+    rng = np.random.default_rng(seed)
+    block = max(1, block_elements // values.shape[0])
+    result = np.empty(n_replicates)
+    for first in range(0, n_replicates, block):
+        size = min(block, n_replicates - first)
+        weights = _poisson_weights(rng, (size, values.shape[0]))
+        result[first:first + size] = (weights @ values) / weights.sum(axis=1)
+    return result
+
+
+def _bootstrap_means(values, n_bootstrap, n_jobs, seed_sequence, block_elements):
+    """
+    Средние пуассоновских реплик с распределением блоков по процессам.
+    """
+    seeds = seed_sequence.spawn(n_jobs)
+    if n_jobs == 1:
+        return _bootstrap_means_worker(values, n_bootstrap, seeds[0], block_elements)
+
+    sizes = [len(part) for part in np.array_split(np.arange(n_bootstrap), n_jobs)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        futures = [executor.submit(_bootstrap_means_worker, values, size, seed, block_elements)
+                   for size, seed in zip(sizes, seeds)]
+        return np.concatenate([future.result() for future in futures])
+
+
+def poisson_bootstrap_test(control, treatment, n_bootstrap=2000, alpha=0.05, n_jobs=None,
+                           seed=None, block_elements=2 ** 23):
+    """
+    Пуассоновский бутстрап разницы средних.
+
+    Каждое наблюдение входит в реплику с весом Poisson(1), поэтому группы
+    ресемплируются независимо, а реплики не требуют индексов и сортировки.
+
+    Args:
+        control (array-like): значения контрольной группы
+        treatment (array-like): значения тестовой группы
+        n_bootstrap (int): количество реплик
+        alpha (float): уровень значимости
+        n_jobs (int): количество процессов (None - по числу CPU)
+        seed (int): зерно генератора
+        block_elements (int): размер матрицы весов на блок реплик
+
+    Returns:
+        dict: diff, relative_diff, перцентильный интервал разницы и p-value
+              (двусторонняя доля реплик по другую сторону от нуля)
+    """
+    control = np.asarray(control, dtype=np.float64)
+    treatment = np.asarray(treatment, dtype=np.float64)
+    n_jobs = max(1, min(n_jobs or os.cpu_count() or 1, n_bootstrap))
+    seed_control, seed_treatment = np.random.SeedSequence(seed).spawn(2)
+
+    means_c = _bootstrap_means(control, n_bootstrap, n_jobs, seed_control, block_elements)
+    means_t = _bootstrap_means(treatment, n_bootstrap, n_jobs, seed_treatment, block_elements)
+    diffs = means_t - means_c
+
+    low, high = np.quantile(diffs, [alpha / 2, 1 - alpha / 2])
+    p_value = min(1.0, 2 * min((diffs <= 0).mean(), (diffs >= 0).mean()))
+    diff = treatment.mean() - control.mean()
+    return {
+        'diff': float(diff),
+        'relative_diff': float(diff / control.mean()),
+        'ci_low': float(low),
+        'ci_high': float(high),
+        'p_value': float(p_value),
+    }
+
+
+def simulate_power(n_control, n_treatment, mu, sigma, effect=0.0, n_experiments=100_000,
+                   alpha=0.05, seed=None, block_elements=2 ** 24):
+    """
+    Монте-Карло оценка мощности и ошибки I рода для логнормальной метрики.
+
+    Генерирует n_experiments синтетических A/B-тестов пакетами: контроль ~
+    LogNormal(mu, sigma), тест - то же, умноженное на (1 + effect), т.е.
+    среднее, медиана и геометрическое среднее растут на effect. При effect=0
+    доля отклонений - ошибка I рода, иначе - мощность.
+
+    Args:
+        n_control (int): размер контрольной группы
+        n_treatment (int): размер тестовой группы
+        mu (float): среднее логарифма метрики
+        sigma (float): стандартное отклонение логарифма метрики
+        effect (float): относительный эффект
+        n_experiments (int): количество синтетических экспериментов
+        alpha (float): уровень значимости
+        seed (int): зерно генератора
+        block_elements (int): число значений, генерируемых за один пакет
+
+    Returns:
+        dict: доля отклонений H0 для 't' (Уэлч), 'log_t' (Уэлч на логарифмах)
+              и 'delta' (относительный прирост дельта-методом)
+    """
+    rng = np.random.default_rng(seed)
+    batch = max(1, block_elements // (n_control + n_treatment))
+    rejections = {'t': 0, 'log_t': 0, 'delta': 0}
+
+    for first in range(0, n_experiments, batch):
+        size = min(batch, n_experiments - first)
+        # Логарифмы генерируются напрямую: log-тест не требует np.log
+        log_c = rng.normal(mu, sigma, size=(size, n_control))
+        log_t = rng.normal(mu + math.log1p(effect), sigma, size=(size, n_treatment))
+
+        moments = []
+        for logs in (log_c, log_t):
+            values = np.exp(logs)
+            moments.append((values.mean(axis=1), values.var(axis=1, ddof=1),
+                            logs.mean(axis=1), logs.var(axis=1, ddof=1), logs.shape[1]))
+        (mean_c, var_c, lmean_c, lvar_c, n_c), (mean_t, var_t, lmean_t, lvar_t, n_t) = moments
+
+        for name, (m_c, v_c, m_t, v_t) in {'t': (mean_c, var_c, mean_t, var_t),
+                                           'log_t': (lmean_c, lvar_c, lmean_t, lvar_t)}.items():
+            welch = _welch_from_moments(m_c, v_c, n_c, m_t, v_t, n_t)
+            rejections[name] += int((welch['p_value'] < alpha).sum())
+
+        # Та же статистика, что в delta_method_ratio_test без знаменателей
+        relative, relative_se = _relative_lift(mean_c, var_c / n_c, mean_t, var_t / n_t)
+        rejections['delta'] += int((_normal_two_sided_p(relative / relative_se) < alpha).sum())
+
+    return {name: count / n_experiments for name, count in rejections.items()}
+
+
+def main():
+    """
+    Демонстрация: проверка рекомендации из t_test_applicability.md.
+    """
+    import time
+
+    rng = np.random.default_rng(1)
+    mu, sigma = 0.0, 1.5
+    control = rng.lognormal(mu, sigma, 200_000)
+    treatment = rng.lognormal(mu, sigma, 200_000) * 1.03
+
+    print("ТЕСТЫ ДЛЯ ЛОГНОРМАЛЬНЫХ МЕТРИК")
+    print("=" * 30)
+    print(f"Оценка параметров по контролю: mu, sigma = {fit_lognormal(control)}")
+
+    log_result = log_t_test(control, treatment)
+    print(f"t-тест на логарифмах: ratio = {log_result['ratio']:.4f} "
+          f"[{log_result['ratio_ci_low']:.4f}; {log_result['ratio_ci_high']:.4f}], "
+          f"p = {log_result['p_value']:.4f}")
+
+    delta = delta_method_ratio_test(control, treatment)
+    print(f"Дельта-метод: прирост = {delta['relative_diff']:+.4f} "
+          f"[{delta['relative_ci_low']:+.4f}; {delta['relative_ci_high']:+.4f}], p = {delta['p_value']:.4f}")
+
+    start = time.time()
+    boot = poisson_bootstrap_test(control, treatment, n_bootstrap=1000, seed=0)
+    print(f"Пуассоновский бутстрап ({time.time() - start:.2f}s): "
+          f"diff = {boot['diff']:.4f} [{boot['ci_low']:.4f}; {boot['ci_high']:.4f}], p = {boot['p_value']:.4f}")
+    print()
+
+    print("Симуляция 10^5 экспериментов, n = 200 в группе:")
+    for effect in (0.0, 0.2):
+        start = time.time()
+        rates = simulate_power(200, 200, mu, sigma, effect=effect, seed=2)
+        label = "ошибка I рода" if effect == 0 else f"мощность (эффект {effect:.0%})"
+        print(f"   {label}: " + ", ".join(f"{name} = {rate:.4f}" for name, rate in rates.items())
+              + f" ({time.time() - start:.1f}s)")
+    print("=" * 15)
+
+
+if __name__ == "__main__":
+    main()